@@ -4,6 +4,8 @@ import pandas as pd
 from tqdm import tqdm
 import pickle as pk
 import os
+import time
+import multiprocessing as mp
 
 import argparse
 
@@ -12,13 +14,16 @@ from utils import (load_words,
                    guess2color,
                    filter_answers,
                    get_expected_information,
+                   get_approximate_expected_information,
                    build_guess_df)
 
 from wordle_solver import (execute_wordle_solver,
                            check_data)
 
 def play_game(secret_word: str, first_guess: str, strategy: str, valid_words: list, 
-                                                  precomputed_outputs: dict = None):
+                                                  precomputed_outputs: dict = None,
+                                                  sample_size: int = None,
+                                                  num_refine: int = 10):
     '''
     Plays one game of wordle
     
@@ -28,6 +33,9 @@ def play_game(secret_word: str, first_guess: str, strategy: str, valid_words: li
         - strategy: one of best_answer, best_guess, or random_answer
         - valid_words: set of wordle words
         - precomputed_outputs: precomputed answer-guess output pairs
+        - sample_size: if given, use approximate expected information 
+                       with this many sampled answers
+        - num_refine: number of top approximate guesses refined exactly
     '''
     
     if precomputed_outputs is None:
@@ -45,10 +53,18 @@ def play_game(secret_word: str, first_guess: str, strategy: str, valid_words: li
 
         if strategy in ["best_answer", "best_guess"]:
 
-            guess_information = get_expected_information(guesses = valid_words, 
-                                                         answers = possible_answers,
-                                                         show_progress = False,
-                                                         precomputed_outputs = precomputed_outputs)
+            if sample_size is None:
+                guess_information = get_expected_information(guesses = valid_words, 
+                                                             answers = possible_answers,
+                                                             show_progress = False,
+                                                             precomputed_outputs = precomputed_outputs)
+            else:
+                guess_information, _ = get_approximate_expected_information(guesses = valid_words, 
+                                                                            answers = possible_answers,
+                                                                            sample_size = sample_size,
+                                                                            num_refine = num_refine,
+                                                                            show_progress = False,
+                                                                            precomputed_outputs = precomputed_outputs)
 
             guess_df = build_guess_df(guess_information, possible_answers)
             guess_options = next_guess_options(guess_df, strategy)
@@ -68,7 +84,9 @@ def play_game(secret_word: str, first_guess: str, strategy: str, valid_words: li
     return board
 
 def evaluate_strategy(strategy: str, valid_words: list, starting_guesses: pd.DataFrame,
-                                                        precomputed_outputs: dict = None):
+                                                        precomputed_outputs: dict = None,
+                                                        sample_size: int = None,
+                                                        num_refine: int = 10):
     '''
     Simulates Wordle Strategy Performance
     
@@ -78,6 +96,9 @@ def evaluate_strategy(strategy: str, valid_words: list, starting_guesses: pd.Dat
         - starting_guesses: dataframe with precomputed guesses and 
                             information values for first guess
         - precomputed_outputs: precomputed answer-guess output pairs
+        - sample_size: if given, use approximate expected information 
+                       with this many sampled answers
+        - num_refine: number of top approximate guesses refined exactly
         
     Returns
         - full_results: dict with keys secret word, 
@@ -105,12 +126,380 @@ def evaluate_strategy(strategy: str, valid_words: list, starting_guesses: pd.Dat
             first_guess = np.random.choice(list(valid_words))
             
         full_results[secret_word] = play_game(secret_word, first_guess, strategy, valid_words, 
-                                              precomputed_outputs = precomputed_outputs)
+                                              precomputed_outputs = precomputed_outputs,
+                                              sample_size = sample_size,
+                                              num_refine = num_refine)
         
     return full_results
 
+def validate_approximation(valid_words: list, starting_guesses: pd.DataFrame, 
+                           sample_size: int, num_refine: int, 
+                           precomputed_outputs: dict = None):
+    '''
+    Compares approximate and exact best_guess decisions
+    
+    Plays the exact best_guess strategy against every secret word, and at 
+    each turn also computes the approximate expected information, checking 
+    whether the approximate best_guess options agree with the exact ones. 
+    
+    Args
+        - valid_words: set of wordle words
+        - starting_guesses: dataframe with precomputed guesses and 
+                            information values for first guess
+        - sample_size: number of answers sampled per approximate estimate
+        - num_refine: number of top approximate guesses refined exactly
+        - precomputed_outputs: precomputed answer-guess output pairs
+        
+    Returns
+        - validation_df: dataframe with one row per decision and columns 
+                         secret_word, turn, num_answers, agree (bool), 
+                         miss_probability, exact_time and approx_time (seconds)
+    '''
+    
+    starting_guess = starting_guesses[starting_guesses["information"] == 
+                                   starting_guesses["information"].max()]["guess"].values[0]
+    
+    rows = []
+    
+    for secret_word in tqdm(valid_words, total = len(valid_words)):
+        
+        #plays the exact best_guess game turn by turn, so each exact decision 
+        #is computed once and timed alongside the approximate one
+        if precomputed_outputs is None:
+            output = guess2color(secret_word, starting_guess)
+        else:
+            output = precomputed_outputs[(secret_word, starting_guess)]
+            
+        board = [(starting_guess, output)]
+        
+        while output != "GGGGG":
+            possible_answers = filter_answers(board, valid_words, 
+                                              precomputed_outputs = precomputed_outputs)
+            
+            start = time.perf_counter()
+            guess_information = get_expected_information(guesses = valid_words, 
+                                                         answers = possible_answers,
+                                                         precomputed_outputs = precomputed_outputs)
+            exact_time = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            approx_information, miss_probability = get_approximate_expected_information(
+                                                         guesses = valid_words, 
+                                                         answers = possible_answers,
+                                                         sample_size = sample_size,
+                                                         num_refine = num_refine,
+                                                         precomputed_outputs = precomputed_outputs)
+            approx_time = time.perf_counter() - start
+            
+            exact_options = next_guess_options(build_guess_df(guess_information, possible_answers), 
+                                               "best_guess")
+            approx_options = next_guess_options(build_guess_df(approx_information, possible_answers), 
+                                                "best_guess")
+            
+            rows.append({"secret_word": secret_word,
+                         "turn": len(board) + 1,
+                         "num_answers": len(possible_answers),
+                         "agree": set(approx_options) == set(exact_options),
+                         "miss_probability": miss_probability,
+                         "exact_time": exact_time,
+                         "approx_time": approx_time})
+            
+            next_guess = np.random.choice(exact_options)
+            
+            if precomputed_outputs is None:
+                output = guess2color(secret_word, next_guess)
+            else:
+                output = precomputed_outputs[(secret_word, next_guess)]
+                
+            board.append((next_guess, output))
+            
+    return pd.DataFrame(rows)
+
+#color outputs are stored as base 3 codes, X: 0, Y: 1, G: 2
+COLOR_CODES = {"X": 0, "Y": 1, "G": 2}
+NUM_OUTPUTS = 3**5
+SOLVED_CODE = NUM_OUTPUTS - 1
+
+#games are tracked up to this many guesses, longer games share the last bin
+MAX_GUESSES = 20
+
+#per worker state for the opener sweep, set by init_sweep_worker
+sweep_state = {}
+
+def build_output_matrix(valid_words: list, precomputed_outputs: dict = None):
+    '''
+    Encodes every guess-answer color output as an integer
+    
+    Args
+        - valid_words: list of wordle words, used as both guesses and answers
+        - precomputed_outputs: precomputed answer-guess output pairs
+        
+    Returns
+        - output_matrix: uint8 array, entry [i, j] is the base 3 code of the 
+                         output when guessing valid_words[i] against answer 
+                         valid_words[j]. GGGGG is encoded as SOLVED_CODE. 
+    '''
+    
+    output_matrix = np.zeros((len(valid_words), len(valid_words)), dtype = np.uint8)
+    
+    #only 243 distinct outputs exist, so encode each one once
+    output_codes = {}
+    
+    def encode(output):
+        if output not in output_codes:
+            output_codes[output] = sum(COLOR_CODES[c] * 3**k for k, c in enumerate(output))
+        return output_codes[output]
+    
+    for i, guess in tqdm(enumerate(valid_words), total = len(valid_words)):
+        
+        if precomputed_outputs is None:
+            outputs = [guess2color(answer, guess) for answer in valid_words]
+        else:
+            outputs = [precomputed_outputs[(answer, guess)] for answer in valid_words]
+            
+        output_matrix[i] = [encode(output) for output in outputs]
+            
+    return output_matrix
+
+def sweep_options(candidates: np.ndarray, strategy: str, output_matrix: np.ndarray):
+    '''
+    Vectorized version of next_guess_options for the opener sweep
+    
+    Information ties are resolved with a small tolerance, since vectorized 
+    sums can differ from get_expected_information in the last bits. 
+    
+    Args
+        - candidates: sorted indices of the possible answers
+        - strategy: one of best_answer, best_guess, or random_answer
+        - output_matrix: encoded outputs from build_output_matrix
+        
+    Returns
+        - options: indices of the guesses the strategy picks uniformly from
+    '''
+    
+    #with at most two candidates, guessing either one is always optimal
+    if strategy == "random_answer" or len(candidates) <= 2:
+        return candidates
+    
+    num_guesses, num_candidates = output_matrix.shape[0], len(candidates)
+    
+    #count outputs per guess as run lengths of the sorted outputs
+    outputs = np.sort(output_matrix[:, candidates], axis = 1)
+    
+    new_run = np.ones(outputs.shape, dtype = bool)
+    new_run[:, 1:] = outputs[:, 1:] != outputs[:, :-1]
+    
+    run_starts = np.flatnonzero(new_run)
+    run_lengths = np.diff(np.append(run_starts, outputs.size))
+    
+    #E_g[I] = log_2(n) - Sum_x c(x) log_2(c(x)) / n, with c(x) the output counts
+    run_information = run_lengths * np.log2(run_lengths)
+    information = np.log2(num_candidates) - np.bincount(run_starts // num_candidates, 
+                                                        weights = run_information,
+                                                        minlength = num_guesses) / num_candidates
+    
+    answer_information = information[candidates]
+    best_answer = candidates[answer_information >= answer_information.max() - 1e-9]
+    
+    if strategy == "best_answer":
+        return best_answer
+    
+    elif strategy == "best_guess":
+        
+        best_guess = np.flatnonzero(information >= information.max() - 1e-9)
+        
+        #prefer guesses with maximum info that are also possible answers
+        best_guess_answer = np.intersect1d(best_guess, candidates)
+        
+        if len(best_guess_answer) > 0:
+            return best_guess_answer
+        
+        else:
+            return best_guess
+    
+    else:
+        raise ValueError("strategy must be one of 'best_answer', 'best_guess', or 'random_answer'")
+
+def solve_candidates(candidates: np.ndarray, strategy: str, output_matrix: np.ndarray, 
+                                                            cache: dict):
+    '''
+    Computes how many more guesses each possible answer takes under a strategy
+    
+    The next guess depends only on the set of possible answers, so results 
+    are cached by candidate set and shared across every opener and secret 
+    word that reaches the same set. Ties are averaged over, matching the 
+    uniform np.random.choice in play_game. 
+    
+    Args
+        - candidates: sorted indices of the possible answers
+        - strategy: one of best_answer, best_guess, or random_answer
+        - output_matrix: encoded outputs from build_output_matrix
+        - cache: dict with keys candidate sets and values solved distributions
+        
+    Returns
+        - guess_dist: array with shape (len(candidates), MAX_GUESSES), entry [i, k] 
+                      is the probability that candidates[i] is found on the 
+                      (k + 1)th guess from now
+    '''
+    
+    key = candidates.tobytes()
+    
+    if key in cache:
+        return cache[key]
+    
+    guess_dist = np.zeros((len(candidates), MAX_GUESSES))
+    
+    options = sweep_options(candidates, strategy, output_matrix)
+    
+    partitions = output_matrix[np.ix_(options, candidates)]
+    counts = np.ones(len(options), dtype = int)
+    
+    #options are either all possible answers, which always split differently,
+    #or all other guesses, which lead to identical games when they split identically
+    if options[0] not in candidates:
+        partitions, counts = np.unique(partitions, axis = 0, return_counts = True)
+    
+    for partition, count in zip(partitions, counts):
+        weight = count / len(options)
+        
+        for output in np.unique(partition):
+            members = partition == output
+            
+            if output == SOLVED_CODE:
+                guess_dist[members, 0] += weight
+                
+            else:
+                sub_dist = solve_candidates(candidates[members], strategy, output_matrix, cache)
+                
+                guess_dist[members, 1:] += weight * sub_dist[:, :-1]
+                guess_dist[members, -1] += weight * sub_dist[:, -1]
+                
+    cache[key] = guess_dist
+    
+    return guess_dist
+
+def init_sweep_worker(output_matrix: np.ndarray, strategy: str):
+    '''
+    Sets up per process state for the opener sweep
+    
+    Args
+        - output_matrix: encoded outputs from build_output_matrix
+        - strategy: one of best_answer, best_guess, or random_answer
+    '''
+    
+    sweep_state["output_matrix"] = output_matrix
+    sweep_state["strategy"] = strategy
+    sweep_state["cache"] = {}
+
+def sweep_opener(opener: int):
+    '''
+    Plays an opener against every secret word, using the worker state
+    
+    Under random_answer every possible answer is a branch, so each opener 
+    caches tens of thousands of candidate sets that other openers rarely 
+    reach. That cache is cleared before each opener to keep worker memory 
+    bounded, while best_guess and best_answer keep reusing theirs. 
+    
+    Args
+        - opener: index of the first guess
+        
+    Returns
+        - opener: index of the first guess
+        - guess_dist: array with shape (num_words, MAX_GUESSES), entry [i, k] 
+                      is the probability that word i is found on guess k + 1
+    '''
+    
+    if sweep_state["strategy"] == "random_answer":
+        sweep_state["cache"] = {}
+    
+    output_matrix = sweep_state["output_matrix"]
+    
+    guess_dist = np.zeros((output_matrix.shape[1], MAX_GUESSES))
+    
+    first_outputs = output_matrix[opener]
+    
+    for output in np.unique(first_outputs):
+        members = np.flatnonzero(first_outputs == output)
+        
+        if output == SOLVED_CODE:
+            guess_dist[members, 0] = 1
+            
+        else:
+            sub_dist = solve_candidates(members, sweep_state["strategy"], output_matrix, 
+                                        sweep_state["cache"])
+            
+            guess_dist[members, 1:] = sub_dist[:, :-1]
+            guess_dist[members, -1] += sub_dist[:, -1]
+            
+    return opener, guess_dist
+
+def sweep_openers(strategy: str, valid_words: list, starting_guesses: pd.DataFrame, 
+                  output_matrix: np.ndarray, num_openers: int = None, num_workers: int = None):
+    '''
+    Evaluates every first guess against every secret word
+    
+    Each opener is scored by its expected number of guesses and failure rate 
+    (more than six guesses), averaged over secret words and tie breaks. 
+    Openers are spread over a process pool, and each worker reuses its 
+    cache of solved candidate sets across all the openers it plays 
+    (except under random_answer, see sweep_opener). 
+    
+    Args
+        - strategy: one of best_answer, best_guess, or random_answer
+        - valid_words: list of wordle words
+        - starting_guesses: dataframe with precomputed guesses and 
+                            information values for first guess
+        - output_matrix: encoded outputs from build_output_matrix
+        - num_openers: only sweep this many openers with highest information
+        - num_workers: number of processes, defaults to all cores
+        
+    Returns
+        - sweep_df: dataframe with columns opener, information, mean_guesses, 
+                    failure_rate and max_guesses, ranked by mean_guesses 
+                    then failure_rate
+    '''
+    
+    if strategy not in ["best_answer", "best_guess", "random_answer"]:
+        raise ValueError("strategy must be one of 'best_answer', 'best_guess', or 'random_answer'")
+        
+    if num_openers is not None and num_openers < 1:
+        raise ValueError("num_openers must be a positive integer")
+    
+    openers = starting_guesses.sort_values("information", ascending = False)["guess"].values
+    
+    if num_openers is not None:
+        openers = openers[:num_openers]
+    
+    word_index = {word: i for i, word in enumerate(valid_words)}
+    opener_indices = [word_index[opener] for opener in openers]
+    
+    rows = []
+    
+    with mp.Pool(num_workers, initializer = init_sweep_worker, 
+                 initargs = (output_matrix, strategy)) as pool:
+        
+        for opener, guess_dist in tqdm(pool.imap_unordered(sweep_opener, opener_indices, chunksize = 4), 
+                                       total = len(opener_indices)):
+            
+            num_guesses = np.arange(1, MAX_GUESSES + 1)
+            
+            rows.append({"opener": valid_words[opener],
+                         "mean_guesses": np.mean(guess_dist @ num_guesses),
+                         "failure_rate": np.mean(guess_dist[:, 6:].sum(axis = 1)),
+                         "max_guesses": num_guesses[guess_dist.sum(axis = 0) > 0].max()})
+    
+    sweep_df = pd.DataFrame(rows).merge(starting_guesses[["guess", "information"]], 
+                                        left_on = "opener", right_on = "guess").drop(columns = "guess")
+    
+    sweep_df = sweep_df[["opener", "information", "mean_guesses", "failure_rate", "max_guesses"]]
+    sweep_df = sweep_df.sort_values(["mean_guesses", "failure_rate"]).reset_index(drop = True)
+    
+    return sweep_df
+
 def run_simulations(strategy_list: list, valid_words: list, starting_guesses: pd.DataFrame, 
-                    results_dir: str, num_reps: int):
+                    results_dir: str, num_reps: int, sample_size: int = None, 
+                    num_refine: int = 10, validate: bool = False, opener_sweep: bool = False,
+                    num_openers: int = None, num_workers: int = None):
     '''
     Runs strategy simulations
     
@@ -121,10 +510,41 @@ def run_simulations(strategy_list: list, valid_words: list, starting_guesses: pd
                             information values for first guess
         - results_dir: where to save results
         - num_reps: number of repetitions
+        - sample_size: if given, use approximate expected information 
+                       with this many sampled answers
+        - num_refine: number of top approximate guesses refined exactly
+        - validate: compare approximate against exact best_guess decisions 
+                    instead of running the strategy simulations
+        - opener_sweep: rank every first guess by simulating it against every 
+                        secret word instead of running the strategy simulations
+        - num_openers: only sweep this many openers with highest information
+        - num_workers: number of processes for the opener sweep, defaults to all cores
     '''
     
     print("Starting evaluation \n")
     
+    if opener_sweep:
+        #the sweep only needs the encoded matrix, so skip the output dict
+        print("Encoding color scores ... ")
+        
+        output_matrix = build_output_matrix(valid_words)
+        
+        for strategy in strategy_list:
+            print("starting {} opener sweep".format(strategy))
+            
+            sweep_df = sweep_openers(strategy, valid_words, starting_guesses, output_matrix, 
+                                     num_openers = num_openers, num_workers = num_workers)
+            
+            file_name = "{}/{}_opener_sweep.csv".format(results_dir, strategy)
+            sweep_df.to_csv(file_name)
+            
+            print(sweep_df.head())
+            print("Finished! saved results to {}".format(file_name))
+            
+        print("All done!")
+        
+        return
+    
     print("Precomputing color scores ... ")
     
     precomputed_outputs = {}
@@ -132,15 +552,41 @@ def run_simulations(strategy_list: list, valid_words: list, starting_guesses: pd
         for guess in valid_words:
             color = guess2color(answer, guess)
             precomputed_outputs[(answer, guess)] = color
+            
+    if validate:
+        print("Validating approximation with sample_size={}, num_refine={}".format(sample_size, num_refine))
+        
+        validation_df = validate_approximation(valid_words, starting_guesses, sample_size, 
+                                               num_refine, precomputed_outputs)
+        
+        file_name = "{}/approximation_validation_sample_size={}_num_refine={}.csv".format(results_dir, 
+                                                                                       sample_size, 
+                                                                                       num_refine)
+        validation_df.to_csv(file_name)
+        
+        print("Agreement with exact best_guess: {:.3f}".format(validation_df["agree"].mean()))
+        print("Mean estimated miss probability: {:.3f}".format(validation_df["miss_probability"].mean()))
+        print("Speedup: {:.2f}x".format(validation_df["exact_time"].sum() / 
+                                        validation_df["approx_time"].sum()))
+        print("Finished! saved results to {}".format(file_name))
+        
+        return
     
     for rep in range(num_reps):
     
         for strategy in strategy_list:
             print("starting {} strategy simulation".format(strategy))
 
-            full_results = evaluate_strategy(strategy, valid_words, starting_guesses, precomputed_outputs)
+            full_results = evaluate_strategy(strategy, valid_words, starting_guesses, precomputed_outputs,
+                                             sample_size = sample_size, num_refine = num_refine)
 
-            file_name = "{}/{}_strategy_full_results_rep={}.pk".format(results_dir, strategy, rep)
+            if sample_size is None:
+                file_name = "{}/{}_strategy_full_results_rep={}.pk".format(results_dir, strategy, rep)
+            else:
+                file_name = "{}/{}_strategy_approx_sample_size={}_full_results_rep={}.pk".format(results_dir, 
+                                                                                              strategy, 
+                                                                                              sample_size, 
+                                                                                              rep)
             pk.dump(full_results, open(file_name, "wb"))
 
             print("Finished! saved results to {}".format(file_name))
@@ -157,16 +603,53 @@ if __name__ == "__main__":
                                                                                                            "best_answer", 
                                                                                                            "random_answer"])
     parser.add_argument("--data_dir", help = "directory with wordle_words.txt", default = "data", type = str)
+    parser.add_argument("--sample_size", help = "approximate information using this many sampled answers", 
+                        default = None, type = int)
+    parser.add_argument("--num_refine", help = "number of top approximate guesses computed exactly", 
+                        default = 10, type = int)
+    parser.add_argument("--validate_approximation", help = "compare approximate and exact best_guess decisions", 
+                        action = "store_true")
+    
+    parser.add_argument("--opener_sweep", help = "rank every first guess against every secret word", 
+                        action = "store_true")
+    parser.add_argument("--num_openers", help = "only sweep this many openers with highest information", 
+                        default = None, type = int)
+    parser.add_argument("--num_workers", help = "number of processes for the opener sweep", 
+                        default = os.cpu_count(), type = int)
     
     args = parser.parse_args()
     
-    valid_words, starting_guesses = check_data(args)
+    if args.sample_size is not None and args.sample_size < 1:
+        parser.error("--sample_size must be a positive integer")
+        
+    if args.num_refine < 1:
+        parser.error("--num_refine must be a positive integer")
+    
+    if args.num_openers is not None and args.num_openers < 1:
+        parser.error("--num_openers must be a positive integer")
+        
+    if args.num_workers < 1:
+        parser.error("--num_workers must be a positive integer")
+    
+    if args.validate_approximation and args.sample_size is None:
+        parser.error("--validate_approximation requires --sample_size")
+        
+    if args.validate_approximation and args.opener_sweep:
+        parser.error("--validate_approximation and --opener_sweep cannot be combined")
+        
+    if args.opener_sweep and args.sample_size is not None:
+        parser.error("--opener_sweep always uses exact information, --sample_size is not supported")
+    
+    valid_words, starting_guesses = check_data(args.data_dir)
     
     if not os.path.isdir(args.results_dir):
         print("Warning! {} directory not found, creating directory".format(args.results_dir))
         os.makedirs(args.results_dir)
 
-    run_simulations(args.strategy_list, valid_words, starting_guesses, args.results_dir, args.num_reps)
+    run_simulations(args.strategy_list, valid_words, starting_guesses, args.results_dir, args.num_reps,
+                    sample_size = args.sample_size, num_refine = args.num_refine, 
+                    validate = args.validate_approximation, opener_sweep = args.opener_sweep,
+                    num_openers = args.num_openers, num_workers = args.num_workers)
         
         
     
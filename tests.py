@@ -1,10 +1,49 @@
 import numpy as np
 
 import unittest
+from unittest import mock
 from utils import (load_words,
                    guess2color,
                    get_color_distribution,
-                   get_expected_information)
+                   get_expected_information,
+                   get_approximate_expected_information,
+                   filter_answers)
+from strategy_simulator import (play_game,
+                                build_output_matrix,
+                                init_sweep_worker,
+                                sweep_opener,
+                                MAX_GUESSES)
+
+def enumerate_expected_guesses(secret_word, first_guess, strategy, valid_words, precomputed_outputs):
+    '''
+    Expected length of play_game, averaged over every random tie break 
+    by replaying the game with each sequence of choices
+    '''
+    
+    expected_guesses = 0
+    choice_sequences = [()]
+    
+    while choice_sequences:
+        prefix = choice_sequences.pop()
+        num_options = []
+        
+        def choice(options):
+            num_options.append(len(options))
+            k = len(num_options) - 1
+            return options[prefix[k]] if k < len(prefix) else options[0]
+        
+        with mock.patch("numpy.random.choice", choice):
+            board = play_game(secret_word, first_guess, strategy, valid_words, 
+                              precomputed_outputs = precomputed_outputs)
+        
+        #branch on every choice made beyond the replayed prefix
+        for k in range(len(prefix), len(num_options)):
+            for j in range(1, num_options[k]):
+                choice_sequences.append(prefix + (0,) * (k - len(prefix)) + (j,))
+                
+        expected_guesses += np.prod([1 / n for n in num_options]) * (len(board) // 2)
+        
+    return expected_guesses
 
 class wordle_tests(unittest.TestCase):
     def test_words_list(self):
@@ -32,6 +71,72 @@ class wordle_tests(unittest.TestCase):
                                              show_progress = False)
         self.assertTrue(np.linalg.norm(guess_information["crane"]
                                        - 5.74) < 0.01)
+
+    def test_approximate_information(self):
+        valid_words = load_words("data/wordle_words.txt")
+        possible_answers = filter_answers([("crane", "XXXXG")], valid_words)
+        exact_information = get_expected_information(guesses = valid_words, 
+                                                     answers = possible_answers,
+                                                     show_progress = False)
+        approx_information, miss_probability = get_approximate_expected_information(
+                                                     guesses = valid_words, 
+                                                     answers = possible_answers,
+                                                     sample_size = 30,
+                                                     show_progress = False)
+        
+        #top approximate guess is always refined to its exact value
+        top_guess = list(approx_information.keys())[0]
+        self.assertAlmostEqual(approx_information[top_guess], exact_information[top_guess])
+        self.assertTrue(0 <= miss_probability <= 1)
+
+    def test_approximate_miss_probability(self):
+        #sorted so the seeded sample does not depend on set ordering
+        valid_words = sorted(load_words("data/wordle_words.txt"))
+        possible_answers = filter_answers([("fuzzy", "XXXXX")], valid_words)
+        
+        np.random.seed(1)
+        approx_information, miss_probability = get_approximate_expected_information(
+                                                     guesses = valid_words, 
+                                                     answers = possible_answers,
+                                                     sample_size = 300,
+                                                     num_refine = 20,
+                                                     show_progress = False)
+        
+        #a large sample leaves few contenders, so the bound is informative
+        self.assertTrue(miss_probability < 0.5)
+        
+        with self.assertRaises(ValueError):
+            get_approximate_expected_information(guesses = valid_words, 
+                                                 answers = possible_answers,
+                                                 num_refine = 0)
+
+    def test_opener_sweep(self):
+        valid_words = sorted(load_words("data/wordle_words.txt"))[-500:]
+        output_matrix = build_output_matrix(valid_words)
+        
+        init_sweep_worker(output_matrix, "best_guess")
+        opener, guess_dist = sweep_opener(valid_words.index("trace"))
+        
+        #every secret word is eventually found, the opener itself on the first guess
+        self.assertTrue(np.allclose(guess_dist.sum(axis = 1), 1))
+        self.assertEqual(guess_dist[opener, 0], 1)
+
+    def test_opener_sweep_matches_play_game(self):
+        valid_words = sorted(load_words("data/wordle_words.txt"))[-100:]
+        precomputed_outputs = {(answer, guess): guess2color(answer, guess) 
+                               for answer in valid_words for guess in valid_words}
+        output_matrix = build_output_matrix(valid_words, precomputed_outputs)
+        
+        for strategy in ["best_guess", "best_answer"]:
+            init_sweep_worker(output_matrix, strategy)
+            opener, guess_dist = sweep_opener(valid_words.index("vogue"))
+            
+            sweep_guesses = np.mean(guess_dist @ np.arange(1, MAX_GUESSES + 1))
+            game_guesses = np.mean([enumerate_expected_guesses(secret_word, "vogue", strategy, 
+                                                               valid_words, precomputed_outputs)
+                                    for secret_word in valid_words])
+            
+            self.assertAlmostEqual(sweep_guesses, game_guesses)
         
         
 if __name__ == "__main__":
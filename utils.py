@@ -1,3 +1,4 @@
+import math
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
@@ -150,6 +151,180 @@ def get_expected_information(guesses: list, answers: list,
         
     return guess_information
 
+def get_approximate_expected_information(guesses: list, answers: list,
+                                         sample_size: int = 100,
+                                         num_refine: int = 10,
+                                         contender_z: float = 3.0,
+                                         return_sorted: bool = True,
+                                         show_progress: bool = False,
+                                         precomputed_outputs: dict = None):
+    '''
+    Approximates the expected information of each guess by scoring it
+    against a random subsample of the possible answers, then refines
+    the top contenders exactly. 
+    
+    Sample estimates use the Miller-Madow bias correction
+    
+    H_hat = - Sum_x q(x) log_2(q(x)) + (K - 1) / (2 n ln(2))
+    
+    where q(x) is the sampled frequency of color output x, K is the number 
+    of distinct outputs observed and n is the sample size. 
+    
+    The num_refine highest estimates among all guesses, and among guesses 
+    that are also possible answers, are recomputed exactly. Refinement then 
+    continues until no estimate exceeds the best exact value, so the top 
+    ranked guess for both the best_guess and best_answer strategies always 
+    carries its exact information. 
+    
+    The chance that an unrefined guess truly beats the best refined guess is 
+    estimated with a normal approximation to the sampling error of the difference 
+    between their estimates (paired over the shared sample, with a finite 
+    population correction), and summed over the unrefined guesses that are 
+    realistic contenders, i.e. within contender_z standard errors of the best. 
+    This is a heuristic, not a guaranteed upper bound: the normal approximation 
+    can be off for small samples, and guesses beyond contender_z are ignored. 
+    
+    Args:
+        - guesses: set of guess words
+        - answers: set of possible answer words
+        - sample_size: number of answers sampled per estimate. Larger values 
+                       are slower but more accurate. If there are no more 
+                       than twice this many answers, information is computed 
+                       exactly. 
+        - num_refine: number of top estimated guesses refined exactly
+        - contender_z: unrefined guesses further than this many standard errors 
+                       behind the best refined guess are left out of the bound
+        - return_sorted: sort by decreasing information 
+        - show_progress: display tqdm progress bar
+        - precomputed_outputs: precomputed answer-guess output pairs
+        
+    Returns: 
+        - guess_information: dictionary with keys guesses and values exact 
+                             (refined) or estimated expected information
+        - miss_probability: estimated (not guaranteed) probability that the 
+                            best guess was not refined
+    '''
+    
+    if sample_size < 1:
+        raise ValueError("sample_size must be a positive integer")
+        
+    if num_refine < 1:
+        raise ValueError("num_refine must be a positive integer")
+    
+    answers = list(answers)
+    
+    #sampling saves little once the sample is a large share of the answers
+    if len(answers) <= 2 * sample_size:
+        guess_information = get_expected_information(guesses = guesses, 
+                                                     answers = answers,
+                                                     return_sorted = return_sorted,
+                                                     show_progress = show_progress,
+                                                     precomputed_outputs = precomputed_outputs)
+        return guess_information, 0.0
+    
+    num_answers = len(answers)
+    sample = list(np.random.choice(answers, size = sample_size, replace = False))
+    
+    #finite population correction for sampling without replacement
+    fpc = (num_answers - sample_size) / (num_answers - 1)
+    
+    guesses = list(guesses)
+    num_guesses = len(guesses)
+    
+    #color outputs of every guess against the sample, as integer codes per guess
+    output_codes = {}
+    sample_outputs = np.zeros((num_guesses, sample_size), dtype = np.int64)
+    
+    for i, g in tqdm(enumerate(guesses), total = num_guesses, disable = not show_progress):
+        
+        if precomputed_outputs is None:
+            outputs = [guess2color(answer = answer, guess = g) for answer in sample]
+        else:
+            outputs = [precomputed_outputs[(answer, g)] for answer in sample]
+            
+        sample_outputs[i] = [output_codes.setdefault(x, len(output_codes)) for x in outputs]
+    
+    #number of sampled answers sharing each answer's color output, per guess
+    sample_outputs += np.arange(num_guesses)[:, None] * len(output_codes)
+    output_counts = np.bincount(sample_outputs.ravel(), minlength = num_guesses * len(output_codes))
+    num_matches = output_counts[sample_outputs]
+    
+    #surprisal of each sampled answer's color output under the sample
+    surprisals = -np.log2(num_matches / sample_size)
+    
+    num_outputs = np.count_nonzero(output_counts.reshape(num_guesses, -1), axis = 1)
+    bias = (num_outputs - 1) / (2 * sample_size * np.log(2))
+    
+    estimates = surprisals.mean(axis = 1) + bias
+    variances = surprisals.var(axis = 1)
+    
+    answer_set = set(answers)
+    pools = [np.arange(num_guesses), 
+             np.asarray([i for i, g in enumerate(guesses) if g in answer_set], dtype = int)]
+    
+    exact = {}
+    
+    def refine(i):
+        exact.update(get_expected_information(guesses = [guesses[i]], 
+                                              answers = answers,
+                                              return_sorted = False,
+                                              precomputed_outputs = precomputed_outputs))
+    
+    miss_probability = 0.0
+    
+    for pool in pools:
+        if len(pool) == 0:
+            continue
+        
+        ranked = pool[np.argsort(-estimates[pool], kind = "stable")]
+        
+        for i in ranked[:num_refine]:
+            if guesses[i] not in exact:
+                refine(i)
+                
+        #keep refining while an estimate could still outrank the best exact value
+        for i in ranked[num_refine:]:
+            best_exact = max(exact[guesses[j]] for j in pool if guesses[j] in exact)
+            if estimates[i] <= best_exact:
+                break
+            if guesses[i] not in exact:
+                refine(i)
+        
+        refined = np.asarray([guesses[i] in exact for i in pool])
+        best = max(pool[refined], key = lambda i: exact[guesses[i]])
+        unrefined = pool[~refined]
+        
+        #compare on the sample scale so both sides share the same estimation bias
+        gaps = estimates[best] - estimates[unrefined]
+        
+        #var(a - b) <= 2 var(a) + 2 var(b), so this cheaply drops guesses 
+        #that cannot be within contender_z standard errors of the best
+        max_std_errors = np.sqrt(2 * (variances[best] + variances[unrefined]) * fpc / sample_size)
+        near = gaps <= contender_z * max_std_errors
+        
+        #pairing surprisals over the shared sample cancels common noise
+        std_errors = np.sqrt(np.var(surprisals[best] - surprisals[unrefined[near]], axis = 1) 
+                             * fpc / sample_size)
+        gaps = gaps[near]
+        
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            z = np.where(std_errors > 0, gaps / std_errors, np.where(gaps > 0, np.inf, 0))
+            
+        #only realistic contenders count, far behind guesses would otherwise
+        #swamp the union bound with thousands of negligible tails
+        pool_miss = sum(0.5 * math.erfc(x / np.sqrt(2)) for x in z[z <= contender_z])
+        
+        miss_probability = max(miss_probability, min(pool_miss, 1.0))
+    
+    guess_information = {g: exact.get(g, estimates[i]) for i, g in enumerate(guesses)}
+    
+    if return_sorted:
+        guess_information = dict(sorted(guess_information.items(), 
+                                   key=lambda item: item[1], 
+                                   reverse = True))
+        
+    return guess_information, miss_probability
+
 def build_guess_df(guess_information: dict, possible_answers: list):
     '''
     Structures guesses
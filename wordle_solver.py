@@ -11,6 +11,7 @@ from utils import (load_words,
                    guess2color, 
                    get_color_distribution, 
                    get_expected_information,
+                   get_approximate_expected_information,
                    build_guess_df, 
                    next_guess_options,
                    filter_answers)
@@ -18,7 +19,9 @@ from utils import (load_words,
 def execute_wordle_solver(board: list, valid_words: list, starting_guesses: pd.DataFrame, 
                                                                 verbose: bool = True, 
                                                                 show_progress: bool = True,
-                                                                precomputed_outputs: dict = None):
+                                                                precomputed_outputs: dict = None,
+                                                                sample_size: int = None,
+                                                                num_refine: int = 10):
     
     '''
     Suggests guesses for wordle games depending on board. 
@@ -30,6 +33,9 @@ def execute_wordle_solver(board: list, valid_words: list, starting_guesses: pd.D
         - verbose: print outputs or not
         - show_progress: show tqdm progress bar
         - precomputed_outputs: cached input output pairs
+        - sample_size: if given, approximate expected information from this 
+                       many sampled answers (see get_approximate_expected_information)
+        - num_refine: number of top approximate guesses refined exactly
         
     Returns
         - guess_df: dataframe with columns guess and information for next guess
@@ -59,15 +65,28 @@ def execute_wordle_solver(board: list, valid_words: list, starting_guesses: pd.D
                 print("We're sorry. There don't seem to be any answers that fit those outputs.")
                 return None
             
-            guess_information = get_expected_information(guesses = valid_words, 
-                                                         answers = possible_answers,
-                                                         show_progress = show_progress,
-                                                         precomputed_outputs = precomputed_outputs)
+            if sample_size is None:
+                guess_information = get_expected_information(guesses = valid_words, 
+                                                             answers = possible_answers,
+                                                             show_progress = show_progress,
+                                                             precomputed_outputs = precomputed_outputs)
+                miss_probability = None
+            else:
+                guess_information, miss_probability = get_approximate_expected_information(
+                                                             guesses = valid_words, 
+                                                             answers = possible_answers,
+                                                             sample_size = sample_size,
+                                                             num_refine = num_refine,
+                                                             show_progress = show_progress,
+                                                             precomputed_outputs = precomputed_outputs)
 
             guess_df = build_guess_df(guess_information, possible_answers)
 
             if verbose:
                 display(guess_df, ["best_guess", "best_answer"])
+                
+                if miss_probability is not None:
+                    print("Approximate mode: estimated probability the best guess was missed ≈ {:.3f}".format(miss_probability))
 
             return guess_df
 
@@ -218,12 +237,23 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument("--board", help = help_message, type = str, nargs = "*", default = [])
     parser.add_argument("--data_dir", help = "directory with wordle_words.txt", default = "data", type = str)
+    parser.add_argument("--sample_size", help = "approximate information using this many sampled answers", 
+                        default = None, type = int)
+    parser.add_argument("--num_refine", help = "number of top approximate guesses computed exactly", 
+                        default = 10, type = int)
     
     args = parser.parse_args()
     
+    if args.sample_size is not None and args.sample_size < 1:
+        parser.error("--sample_size must be a positive integer")
+        
+    if args.num_refine < 1:
+        parser.error("--num_refine must be a positive integer")
+    
     final_board = check_board(args.board)
     valid_words, starting_guesses = check_data(args.data_dir)
     
-    execute_wordle_solver(final_board, valid_words, starting_guesses)
+    execute_wordle_solver(final_board, valid_words, starting_guesses, 
+                          sample_size = args.sample_size, num_refine = args.num_refine)
     
     